@@ -22,6 +22,25 @@ FRAME_WIDTH = int(os.getenv("FRAME_WIDTH", "640"))
 FRAME_HEIGHT = int(os.getenv("FRAME_HEIGHT", "384"))
 TARGET_FPS = int(os.getenv("TARGET_FPS", "15"))
 
+# Batch (offline) analysis settings
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "8"))
+DECODE_THREADS = int(os.getenv("DECODE_THREADS", str(max(1, (os.cpu_count() or 1) // 2))))
+PREFETCH_FRAMES = int(os.getenv("PREFETCH_FRAMES", "64"))
+MIN_SEGMENT_FRAMES = int(os.getenv("MIN_SEGMENT_FRAMES", "300"))
+
+# Static buffer (allocation-free) frame path settings
+INFERENCE_SIZE = int(os.getenv("INFERENCE_SIZE", "640"))
+MAX_DETECTIONS = int(os.getenv("MAX_DETECTIONS", "32"))
+
+# Edge/hub settings
+HUB_HOST = os.getenv("HUB_HOST", "127.0.0.1")
+HUB_PORT = int(os.getenv("HUB_PORT", "5600"))
+HUB_MAX_PENDING = int(os.getenv("HUB_MAX_PENDING", "32"))
+HUB_BIND = os.getenv("HUB_BIND", "127.0.0.1")  # Camera LAN address only, never a public interface
+MAX_FRAME_PIXELS = int(os.getenv("MAX_FRAME_PIXELS", str(1920 * 1080)))
+EDGE_FPS = float(os.getenv("EDGE_FPS", "5"))
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "70"))
+
 # SMS settings
 SERIAL_BAUDRATE = int(os.getenv("SERIAL_BAUDRATE", "115200"))
 SERIAL_PORT = os.getenv("SERIAL_PORT", "")  # Auto-detect if empty
@@ -32,6 +51,7 @@ EVENT_COOLDOWN_SECONDS = int(os.getenv("EVENT_COOLDOWN_SECONDS", "60"))
 
 # Paths
 LOG_DIR = Path("logs")
+MEMORY_REPORT_CSV = LOG_DIR / "memory.csv"
 PID_FILE = Path("run/raspi-detect.pid")
 
 # Create directories
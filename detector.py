@@ -5,10 +5,19 @@ Integrated YOLOv5 Detection and SMS Alert System
 Detects people, dogs, and cats using YOLOv5n.pt and sends SMS alerts via SIM7600
 """
 
+import gc
 import os
 import sys
+import csv
+import json
 import time
 import glob
+import queue
+import socket
+import argparse
+import threading
+import tracemalloc
+import socketserver
 import serial
 import urllib.request
 from pathlib import Path
@@ -18,8 +27,11 @@ from collections import defaultdict
 import cv2
 import numpy as np
 import torch
+from torchvision.ops import batched_nms
 from ultralytics import YOLO
 
+from edge import FRAME_HEADER, ACK_HEADER, HUB_PORT, STATS_INTERVAL_SECONDS, recv_exact, decode_node_id
+
 # Configuration
 CONFIDENCE_THRESHOLD = 0.35
 NMS_IOU_THRESHOLD = 0.45
@@ -39,9 +51,29 @@ FRAME_WIDTH = 640
 FRAME_HEIGHT = 384
 TARGET_FPS = 15
 
+# Batch (offline) analysis settings
+BATCH_SIZE = 8
+DECODE_THREADS = max(1, (os.cpu_count() or 1) // 2)
+PREFETCH_FRAMES = 64
+MIN_SEGMENT_FRAMES = 300  # Shortest video range handed to one decode thread
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".h264", ".mjpeg", ".webm"}
+
+# Static buffer (allocation-free) frame path settings
+INFERENCE_SIZE = 640  # Longest side of the model input
+MAX_DETECTIONS = 32
+
+# Hub settings (edge nodes stream frames to the hub, see edge.py)
+HUB_BIND = "127.0.0.1"  # Set to the camera LAN address, never expose the hub beyond it
+HUB_MAX_PENDING = 32  # Frames queued for inference before the oldest are dropped
+MAX_FRAME_BYTES = 8 * 1024 * 1024
+MAX_FRAME_PIXELS = 1920 * 1080  # Largest decoded frame accepted from an edge node
+ACK_QUEUE_SIZE = 64  # Acks buffered per node before they are dropped
+
 # Logging
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(parents=True, exist_ok=True)
+MEMORY_REPORT_CSV = LOG_DIR / "memory.csv"
 PID_FILE = Path("run/raspi-detect.pid")
 PID_FILE.parent.mkdir(parents=True, exist_ok=True)
 
@@ -71,20 +103,152 @@ class YOLOv5Detector:
         detections = []
         
         for result in results:
-            for box in result.boxes:
-                class_id = int(box.cls[0])
-                confidence = float(box.conf[0])
-                
-                if class_id in TARGET_CLASSES:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    detections.append({
-                        "class_id": class_id,
-                        "label": TARGET_CLASSES[class_id],
-                        "confidence": confidence,
-                        "box": [int(x1), int(y1), int(x2-x1), int(y2-y1)]
-                    })
+            detections.extend(self._parse_result(result))
         
         return detections
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Dict]]:
+        """Detect objects in several frames with a single model call"""
+        if not frames:
+            return []
+        results = self.model(frames, conf=CONFIDENCE_THRESHOLD, iou=NMS_IOU_THRESHOLD, verbose=False)
+        return [self._parse_result(result) for result in results]
+    
+    def _parse_result(self, result) -> List[Dict]:
+        """Convert one ultralytics result into detection dicts"""
+        detections = []
+        for box in result.boxes:
+            class_id = int(box.cls[0])
+            confidence = float(box.conf[0])
+            
+            if class_id in TARGET_CLASSES:
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                detections.append({
+                    "class_id": class_id,
+                    "label": TARGET_CLASSES[class_id],
+                    "confidence": confidence,
+                    "box": [int(x1), int(y1), int(x2-x1), int(y2-y1)]
+                })
+        return detections
+
+
+class StaticFramePath:
+    """Run the detector on preallocated buffers that are reused every frame
+    
+    The camera frame, letterboxed image, input tensor, score buffers and
+    output array are allocated once for a given frame size and then filled in
+    place. The network forward pass bypasses the ultralytics predictor and its
+    output is decoded with torchvision NMS into ``self.detections``, whose
+    rows are ``[x1, y1, x2, y2, confidence, class_id]``. Callers read those
+    rows directly; only NMS on frames that contain candidates and the
+    network's own activations still allocate temporaries.
+    """
+    
+    def __init__(self, detector: YOLOv5Detector, max_det: int = MAX_DETECTIONS):
+        # Fuse Conv+BN as the ultralytics predictor does before inference
+        self.net = detector.model.model.float().fuse(verbose=False).eval()
+        self.stride = int(max(self.net.stride)) if hasattr(self.net, "stride") else 32
+        self.max_det = max_det
+        
+        self.frame = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+        self.detections = np.zeros((max_det, 6), dtype=np.float32)
+        self._det_t = torch.from_numpy(self.detections)
+        self.class_counts = np.zeros(max(TARGET_CLASSES) + 1, dtype=np.int32)
+        self._shape = None
+        self._anchors = None
+    
+    def _allocate(self, h: int, w: int):
+        """Allocate letterbox and tensor buffers for a frame size"""
+        r = INFERENCE_SIZE / max(h, w)
+        nh, nw = round(h * r), round(w * r)
+        in_h = -(-nh // self.stride) * self.stride
+        in_w = -(-nw // self.stride) * self.stride
+        top, left = (in_h - nh) // 2, (in_w - nw) // 2
+        
+        self.canvas = np.full((in_h, in_w, 3), 114, dtype=np.uint8)
+        self.rgb = np.empty_like(self.canvas)
+        self._region = self.canvas[top:top + nh, left:left + nw]
+        self.tensor = torch.empty((1, 3, in_h, in_w), dtype=torch.float32)
+        self._chw = torch.from_numpy(self.rgb).permute(2, 0, 1)
+        self._scale = r
+        self._offset = torch.tensor([left, top, left, top], dtype=torch.float32)
+        self._limit = torch.tensor([w, h, w, h], dtype=torch.float32)
+        self._shape = (h, w)
+        self._anchors = None
+    
+    def _allocate_outputs(self, classes: int, anchors: int):
+        """Allocate score buffers for the number of classes and anchors the model predicts"""
+        self._target_lut = torch.zeros(classes, dtype=torch.bool)
+        self._target_lut[[c for c in TARGET_CLASSES if c < classes]] = True
+        self._conf = torch.empty(anchors, dtype=torch.float32)
+        self._cls = torch.empty(anchors, dtype=torch.long)
+        self._is_target = torch.empty(anchors, dtype=torch.bool)
+        self._mask = torch.empty(anchors, dtype=torch.bool)
+        self._anchors = anchors
+    
+    def read(self, cap) -> bool:
+        """Read the next camera frame into the reusable frame buffer"""
+        ret, frame = cap.read(self.frame)
+        if ret and frame is not self.frame:
+            # Camera delivered a different size, keep its buffer from now on
+            self.frame = frame
+        return ret
+    
+    @torch.inference_mode()
+    def detect(self) -> int:
+        """Detect objects in the current frame buffer, returns the number of rows filled"""
+        h, w = self.frame.shape[:2]
+        if self._shape != (h, w):
+            self._allocate(h, w)
+        
+        if self._region.shape[:2] == (h, w):
+            np.copyto(self._region, self.frame)
+        else:
+            cv2.resize(self.frame, (self._region.shape[1], self._region.shape[0]),
+                       dst=self._region, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self.canvas, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        self.tensor[0].copy_(self._chw)
+        self.tensor.mul_(1.0 / 255.0)
+        
+        out = self.net(self.tensor)
+        pred = (out[0] if isinstance(out, (list, tuple)) else out)[0]  # (4 + classes, anchors)
+        if self._anchors != pred.shape[1]:
+            self._allocate_outputs(pred.shape[0] - 4, pred.shape[1])
+        
+        # Best class over all classes, then keep only target classes (as detect() does)
+        torch.max(pred[4:], 0, out=(self._conf, self._cls))
+        torch.index_select(self._target_lut, 0, self._cls, out=self._is_target)
+        torch.gt(self._conf, CONFIDENCE_THRESHOLD, out=self._mask)
+        self._mask.logical_and_(self._is_target)
+        if not self._mask.any():
+            return 0
+        
+        idx = self._mask.nonzero().squeeze(1)
+        xywh = pred[:4, idx].T
+        boxes = torch.cat((xywh[:, :2] - xywh[:, 2:] / 2, xywh[:, :2] + xywh[:, 2:] / 2), 1)
+        conf = self._conf[idx]
+        cls = self._cls[idx]
+        keep = batched_nms(boxes, conf, cls, NMS_IOU_THRESHOLD)[:self.max_det]
+        n = len(keep)
+        
+        rows = self._det_t[:n]
+        xyxy = (boxes[keep] - self._offset) / self._scale
+        rows[:, :4] = torch.minimum(xyxy.clamp(min=0), self._limit)
+        rows[:, 4] = conf[keep]
+        rows[:, 5] = cls[keep]
+        return n
+    
+    def count_classes(self, n: int) -> np.ndarray:
+        """Count the first n detection rows per class id into ``self.class_counts``"""
+        self.class_counts.fill(0)
+        for i in range(n):
+            self.class_counts[int(self.detections[i, 5])] += 1
+        return self.class_counts
+    
+    def label_counts(self, n: int) -> Dict[str, int]:
+        """Detection counts by label, for building an alert message"""
+        counts = self.count_classes(n)
+        return {label: int(counts[class_id]) for class_id, label in TARGET_CLASSES.items()}
 
 
 class SIM7600SMS:
@@ -188,8 +352,680 @@ def open_camera():
     return cap
 
 
-def main():
+class NodeStats:
+    """One edge node connection and its statistics for the current reporting window
+    
+    Acks are queued to a writer thread owned by the connection, so a node that
+    stops reading only loses its own acks instead of stalling the hub.
+    """
+    
+    def __init__(self, node_id: str, address: Tuple, sock: socket.socket):
+        self.node_id = node_id
+        self.label = f"{node_id} ({address[0]}:{address[1]})"
+        self.sock = sock
+        self.connected = True
+        self.acks = queue.Queue(maxsize=ACK_QUEUE_SIZE)
+        self.total_frames = 0
+        self.reset()
+        threading.Thread(target=self._ack_writer, daemon=True).start()
+    
+    def reset(self):
+        """Start a new reporting window"""
+        self.frames = self.bytes = self.dropped = self.acks_dropped = 0
+        self.latency_sum = self.latency_max = self.hub_sum = 0.0
+    
+    def queue_ack(self, seq: int, capture_ts: float, count: int):
+        """Queue a per-frame ack, dropping it if the node is not reading"""
+        if not self.connected:
+            return
+        try:
+            self.acks.put_nowait(ACK_HEADER.pack(seq, capture_ts, min(count, 0xFFFF)))
+        except queue.Full:
+            self.acks_dropped += 1
+    
+    def _ack_writer(self):
+        """Send queued acks until the connection closes"""
+        while self.connected:
+            try:
+                data = self.acks.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if data is None:
+                break
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                break
+    
+    def close(self):
+        """Mark the connection closed, the ack writer exits within a second"""
+        self.connected = False
+
+
+class DetectionHub:
+    """Batch frames from all edge nodes through one detector and route alerts via one modem
+    
+    Connection handler threads decode incoming JPEGs into a bounded queue; the
+    inference loop drains up to batch_size frames at a time, acks each frame
+    back to its node and hands alerts to a separate thread so that a slow SMS
+    never stalls detection.
+    """
+    
+    def __init__(self, detector: YOLOv5Detector, sms_handler: Optional[SIM7600SMS] = None,
+                 batch_size: int = BATCH_SIZE, max_pending: int = HUB_MAX_PENDING):
+        self.detector = detector
+        self.sms_handler = sms_handler
+        self.batch_size = batch_size
+        self.frames = queue.Queue(maxsize=max_pending)
+        self.alerts = queue.Queue()
+        self.nodes: List[NodeStats] = []
+        self.lock = threading.Lock()
+        self.last_sent = {}
+        self.window_start = time.time()
+    
+    def register(self, node_id: str, address: Tuple, sock: socket.socket) -> NodeStats:
+        """Create the stats entry for a new edge connection"""
+        node = NodeStats(node_id or address[0], address, sock)
+        with self.lock:
+            if any(n.node_id == node_id and n.connected for n in self.nodes):
+                print(f"Edge node id {node_id} is already connected, "
+                      f"reporting {node.label} as a separate connection")
+            self.nodes.append(node)
+        print(f"Edge node connected: {node.label}")
+        return node
+    
+    def unregister(self, node: NodeStats):
+        """Mark a connection closed, it is dropped after the next report"""
+        node.close()
+        print(f"Edge node disconnected: {node.label}, {node.total_frames} frames processed")
+    
+    def submit(self, node: NodeStats, seq: int, capture_ts: float, frame: np.ndarray, size: int):
+        """Queue a decoded frame for inference, dropping the oldest one if the hub is behind"""
+        item = (node, seq, capture_ts, time.time(), frame)
+        with self.lock:
+            node.bytes += size
+        while True:
+            try:
+                self.frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    old = self.frames.get_nowait()
+                    with self.lock:
+                        old[0].dropped += 1
+                except queue.Empty:
+                    pass
+    
+    def _next_batch(self, timeout: float = 0.5) -> List[Tuple]:
+        """Wait for one frame, then take whatever else is already queued up to batch_size"""
+        try:
+            batch = [self.frames.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.frames.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def process(self, batch: List[Tuple]):
+        """Run one batch through the detector, ack frames and queue alerts"""
+        results = self.detector.detect_batch([item[4] for item in batch])
+        done = time.time()
+        
+        for (node, seq, capture_ts, received, _), detections in zip(batch, results):
+            with self.lock:
+                node.frames += 1
+                node.total_frames += 1
+                node.latency_sum += done - capture_ts
+                node.latency_max = max(node.latency_max, done - capture_ts)
+                node.hub_sum += done - received
+            node.queue_ack(seq, capture_ts, len(detections))
+            
+            if not detections:
+                continue
+            counts = defaultdict(int)
+            for det in detections:
+                counts[det["label"]] += 1
+            print(f"[{node.label}] " + ", ".join(
+                f"{det['label']} ({det['confidence']:.2f})" for det in detections))
+            
+            if self.sms_handler and done - self.last_sent.get(node.node_id, 0) >= EVENT_COOLDOWN_SECONDS:
+                self.alerts.put(f"[{node.node_id}] " + format_alert_message(counts))
+                self.last_sent[node.node_id] = done
+    
+    def _alert_worker(self):
+        """Send queued alerts through the single SMS modem"""
+        while True:
+            message = self.alerts.get()
+            if message is None:
+                break
+            print(f"Sending alert: {message}")
+            self.sms_handler.send_sms(DESTINATION_NUMBERS, message)
+    
+    def report(self):
+        """Print per node frame rate, bandwidth and latency for the current window"""
+        now = time.time()
+        elapsed = max(now - self.window_start, 1e-6)
+        with self.lock:
+            for node in self.nodes:
+                if node.frames:
+                    latency = (f"capture->result {node.latency_sum / node.frames * 1000:.0f} ms avg, "
+                               f"{node.latency_max * 1000:.0f} ms max, "
+                               f"hub {node.hub_sum / node.frames * 1000:.0f} ms avg")
+                else:
+                    latency = "no frames"
+                status = "" if node.connected else " (disconnected)"
+                print(f"Node {node.label}{status}: {node.frames / elapsed:.1f} FPS, "
+                      f"{node.bytes / elapsed / 1024:.1f} KB/s, {node.dropped} dropped, "
+                      f"{node.acks_dropped} acks dropped, {latency}")
+                node.reset()
+            self.nodes = [node for node in self.nodes if node.connected]
+        self.window_start = now
+    
+    def run(self, stop: threading.Event):
+        """Inference loop, runs until stop is set"""
+        alert_thread = None
+        if self.sms_handler:
+            alert_thread = threading.Thread(target=self._alert_worker, daemon=True)
+            alert_thread.start()
+        
+        next_report = time.time() + STATS_INTERVAL_SECONDS
+        try:
+            while not stop.is_set():
+                batch = self._next_batch()
+                if batch:
+                    self.process(batch)
+                if time.time() >= next_report:
+                    self.report()
+                    next_report = time.time() + STATS_INTERVAL_SECONDS
+        finally:
+            self.report()
+            if alert_thread:
+                self.alerts.put(None)
+                alert_thread.join(timeout=30)
+
+
+def jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG's SOF header without decoding it"""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1  # Fill byte
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            i += 2  # Markers without a length
+            continue
+        if marker in (0xD9, 0xDA):
+            return None  # End of image or start of scan before any frame header
+        length = int.from_bytes(data[i + 2:i + 4], "big")
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if i + 9 > len(data):
+                return None
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + length
+    return None
+
+
+class _EdgeHandler(socketserver.BaseRequestHandler):
+    """Receive frames from one edge node connection"""
+    
+    def handle(self):
+        hub = self.server.hub
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        node = None
+        try:
+            while True:
+                header = recv_exact(sock, FRAME_HEADER.size)
+                if header is None:
+                    break
+                raw_id, seq, capture_ts, size = FRAME_HEADER.unpack(header)
+                if size > MAX_FRAME_BYTES:
+                    print(f"Frame of {size} bytes from {self.client_address} too large, closing")
+                    break
+                payload = recv_exact(sock, size)
+                if payload is None:
+                    break
+                
+                if node is None:
+                    node = hub.register(decode_node_id(raw_id), self.client_address, sock)
+                
+                # Check the JPEG header before decoding, a small file can decode to a huge image
+                dims = jpeg_dimensions(payload)
+                if dims is None or dims[0] * dims[1] > MAX_FRAME_PIXELS:
+                    print(f"[{node.label}] Rejected frame {seq}: not a JPEG or larger than "
+                          f"{MAX_FRAME_PIXELS} pixels ({dims})")
+                    continue
+                frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None or frame.shape[0] * frame.shape[1] > MAX_FRAME_PIXELS:
+                    print(f"[{node.label}] Failed to decode frame {seq}")
+                    continue
+                hub.submit(node, seq, capture_ts, frame, FRAME_HEADER.size + size)
+        except OSError as e:
+            print(f"Edge connection error {self.client_address}: {e}")
+        finally:
+            if node is not None:
+                hub.unregister(node)
+
+
+class _HubServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def run_hub(host: str = HUB_BIND, port: int = HUB_PORT, batch_size: int = BATCH_SIZE,
+            duration: float = 0) -> int:
+    """Accept edge node streams and run them through one detector"""
+    torch.set_num_threads(os.cpu_count() or 1)
+    
+    print("Initializing YOLOv5 detector...")
+    detector = YOLOv5Detector()
+    
+    sms_handler = None
+    try:
+        print("Initializing SMS handler...")
+        sms_handler = SIM7600SMS()
+    except Exception as e:
+        print(f"SMS initialization failed: {e}")
+        print("Continuing without SMS alerts...")
+    
+    hub = DetectionHub(detector, sms_handler, batch_size)
+    server = _HubServer((host, port), _EdgeHandler)
+    server.hub = hub
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Hub listening on {host}:{port}. Press Ctrl+C to stop.")
+    
+    stop = threading.Event()
+    timer = None
+    if duration > 0:
+        timer = threading.Timer(duration, stop.set)
+        timer.daemon = True
+        timer.start()
+    try:
+        hub.run(stop)
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        if timer:
+            timer.cancel()
+        server.shutdown()
+        server.server_close()
+        if sms_handler:
+            sms_handler.close()
+    return 0
+
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryReport:
+    """Periodic tracemalloc and RSS report for long soak runs
+    
+    Every interval a row is appended to a CSV file with RSS, Python heap
+    usage and GC collection counts, and the allocation sites that grew most
+    since the first sample are printed.
+    """
+    
+    FIELDS = ["time", "elapsed_s", "frames", "rss_mb", "traced_mb", "traced_peak_mb",
+              "gc_gen0", "gc_gen1", "gc_gen2"]
+    
+    def __init__(self, interval: float, path: Path = MEMORY_REPORT_CSV, top: int = 5):
+        self.interval = interval
+        self.top = top
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tracemalloc.start()
+        self.fh = open(self.path, "w", newline="")
+        self.csv = csv.writer(self.fh)
+        self.csv.writerow(self.FIELDS)
+        self.t0 = time.time()
+        self.next_t = self.t0 + interval
+        self.baseline = None
+        self.first_rss = None
+        self.last_rss = None
+        self.frames = 0
+    
+    def tick(self):
+        """Count a frame and sample if the interval has elapsed"""
+        self.frames += 1
+        if time.time() >= self.next_t:
+            self.sample()
+    
+    def sample(self):
+        """Record one memory sample"""
+        now = time.time()
+        self.next_t = now + self.interval
+        rss = _rss_bytes()
+        current, peak = tracemalloc.get_traced_memory()
+        gc_counts = [s["collections"] for s in gc.get_stats()]
+        self.csv.writerow([time.strftime("%Y-%m-%d %H:%M:%S"), round(now - self.t0, 1), self.frames,
+                           round(rss / 2**20, 2), round(current / 2**20, 3), round(peak / 2**20, 3),
+                           *gc_counts])
+        self.fh.flush()
+        
+        if self.first_rss is None:
+            self.first_rss = rss
+        self.last_rss = rss
+        print(f"Memory: RSS {rss / 2**20:.1f} MB "
+              f"(drift {(rss - self.first_rss) / 2**20:+.1f} MB), "
+              f"traced {current / 2**20:.2f} MB, peak {peak / 2**20:.2f} MB, "
+              f"gc {gc_counts}")
+        
+        snapshot = tracemalloc.take_snapshot()
+        if self.baseline is None:
+            self.baseline = snapshot
+            return
+        for stat in snapshot.compare_to(self.baseline, "lineno")[:self.top]:
+            if stat.size_diff > 0:
+                print(f"  +{stat.size_diff / 1024:.1f} KiB {stat.traceback}")
+    
+    def close(self):
+        """Write a final sample and stop tracing"""
+        try:
+            self.sample()
+            if self.first_rss is not None:
+                print(f"Memory report written to {self.path}: RSS drift "
+                      f"{(self.last_rss - self.first_rss) / 2**20:+.1f} MB over {self.frames} frames")
+        finally:
+            self.fh.close()
+            tracemalloc.stop()
+
+
+def collect_media_files(inputs: List[str]) -> List[Path]:
+    """Expand input files and folders into a sorted list of images and videos"""
+    media_exts = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS
+    files = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in media_exts))
+        elif path.is_file():
+            files.append(path)
+        else:
+            print(f"Skipping missing input: {path}")
+    return files
+
+
+def plan_decode_work(files: List[Path], threads: int = DECODE_THREADS) -> List[Tuple]:
+    """Split inputs into (path, start_frame, end_frame) decode units
+    
+    Long videos are cut into seek ranges so that a single recording keeps
+    every decode thread busy. The last range of each video reads to EOF
+    (end_frame None) because the container frame count is only an estimate.
+    Images, videos of unknown length and streams that cannot seek are
+    decoded as one unit.
+    """
+    work = []
+    for path in files:
+        if path.suffix.lower() in IMAGE_EXTENSIONS:
+            work.append((path, 0, None))
+            continue
+        cap = cv2.VideoCapture(str(path))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        segment = max(MIN_SEGMENT_FRAMES, -(-total // max(1, threads)))
+        seekable = total > segment and _seek(cap, segment)
+        cap.release()
+        if not seekable:
+            work.append((path, 0, None))
+            continue
+        starts = list(range(0, total, segment))
+        for start, end in zip(starts, starts[1:] + [None]):
+            work.append((path, start, end))
+    return work
+
+
+def _seek(cap, frame_index: int) -> bool:
+    """Seek a capture to a frame, returns False if the stream did not land there"""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    return int(round(cap.get(cv2.CAP_PROP_POS_FRAMES))) == frame_index
+
+
+def _decode_source(path: Path, start: int, end: Optional[int],
+                   out_queue: queue.Queue, stop: threading.Event) -> int:
+    """Decode one image or a frame range of a video into the frame queue"""
+    mtime = path.stat().st_mtime
+    if path.suffix.lower() in IMAGE_EXTENSIONS:
+        frame = cv2.imread(str(path))
+        if frame is None:
+            print(f"Failed to read image: {path}")
+            return 0
+        # Snapshots have no stream position
+        out_queue.put((str(path), 0, None, mtime, frame))
+        return 1
+    
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        print(f"Failed to open video: {path}")
+        return 0
+    
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    if start and not _seek(cap, start):
+        # Seek failed despite the planning probe, skip forward frame by frame
+        print(f"Seek failed in {path}, skipping to frame {start}")
+        cap.release()
+        cap = cv2.VideoCapture(str(path))
+        for _ in range(start):
+            if stop.is_set() or not cap.grab():
+                cap.release()
+                return 0
+    index = start
+    try:
+        while not stop.is_set() and (end is None or index < end):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if fps > 0:
+                position = index / fps
+            else:
+                position = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            out_queue.put((str(path), index, position, mtime, frame))
+            index += 1
+    finally:
+        cap.release()
+    return index - start
+
+
+def iter_media_frames(files: List[Path], threads: int = DECODE_THREADS,
+                      prefetch: int = PREFETCH_FRAMES):
+    """Yield (source, frame_index, position_s, file_mtime, frame) tuples decoded by background threads
+    
+    Workers take decode units from plan_decode_work(), so frames stay in order
+    within a unit while several files or ranges of one video are decoded in
+    parallel. Frames from different units may be interleaved. position_s is
+    None for images.
+    """
+    units = queue.Queue()
+    for unit in plan_decode_work(files, threads):
+        units.put(unit)
+    
+    frames = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    done = object()
+    
+    def worker():
+        try:
+            while not stop.is_set():
+                try:
+                    path, start, end = units.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    _decode_source(path, start, end, frames, stop)
+                except Exception as e:
+                    print(f"Decode error in {path}: {e}")
+        finally:
+            frames.put(done)
+    
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, threads))]
+    for t in workers:
+        t.start()
+    
+    remaining = len(workers)
+    try:
+        while remaining:
+            item = frames.get()
+            if item is done:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        stop.set()
+        # Drain so blocked workers can observe the stop flag and exit
+        while any(t.is_alive() for t in workers):
+            try:
+                frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+class DetectionWriter:
+    """Write detections as JSONL or CSV depending on the output extension
+    
+    With all_frames, frames without detections get one row with empty
+    detection fields so the output also records which frames were analysed.
+    """
+    
+    FIELDS = ["source", "frame", "position_s", "file_mtime", "class_id", "label", "confidence",
+              "x", "y", "w", "h"]
+    
+    def __init__(self, path: Path, all_frames: bool = False):
+        self.path = Path(path)
+        self.all_frames = all_frames
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fh = open(self.path, "w", newline="")
+        self.csv = None
+        if self.path.suffix.lower() == ".csv":
+            self.csv = csv.writer(self.fh)
+            self.csv.writerow(self.FIELDS)
+        self.rows = 0
+    
+    def write(self, source: str, frame_index: int, position: Optional[float], mtime: float,
+              detections: List[Dict]):
+        """Write one row per detection"""
+        if position is not None:
+            position = round(position, 3)
+        frame_fields = [source, frame_index, position, round(mtime, 3)]
+        if not detections and self.all_frames:
+            self._write_row(frame_fields + [None] * 7)
+        for det in detections:
+            x, y, w, h = det["box"]
+            self._write_row(frame_fields + [det["class_id"], det["label"],
+                                            round(det["confidence"], 4), x, y, w, h])
+            self.rows += 1
+    
+    def _write_row(self, row: List):
+        """Write one CSV row or JSON line"""
+        if self.csv:
+            self.csv.writerow(row)
+        else:
+            self.fh.write(json.dumps(dict(zip(self.FIELDS, row))) + "\n")
+    
+    def close(self):
+        """Close output file"""
+        self.fh.close()
+
+
+def run_batch(inputs: List[str], output: str, batch_size: int = BATCH_SIZE,
+              threads: int = DECODE_THREADS, all_frames: bool = False) -> int:
+    """Run the detector over image folders and video files and write detections to disk"""
+    files = collect_media_files(inputs)
+    if not files:
+        print("No images or videos found")
+        return 1
+    
+    # Give inference the cores not used by the decode threads
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) - threads))
+    
+    print(f"Batch mode: {len(files)} file(s), batch size {batch_size}, {threads} decode thread(s)")
+    detector = YOLOv5Detector()
+    writer = DetectionWriter(Path(output), all_frames)
+    
+    frames_done = 0
+    media_seconds = defaultdict(float)
+    t0 = time.time()
+    batch = []
+    
+    def flush():
+        nonlocal frames_done
+        results = detector.detect_batch([item[4] for item in batch])
+        for (source, index, position, mtime, _), detections in zip(batch, results):
+            writer.write(source, index, position, mtime, detections)
+            if position is not None:
+                media_seconds[source] = max(media_seconds[source], position)
+        frames_done += len(batch)
+        batch.clear()
+    
+    try:
+        for item in iter_media_frames(files, threads=threads):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    except KeyboardInterrupt:
+        print("\nBatch interrupted, partial results kept")
+    finally:
+        writer.close()
+    
+    elapsed = max(time.time() - t0, 1e-6)
+    footage = sum(media_seconds.values())
+    print(f"Processed {frames_done} frames in {elapsed:.1f}s ({frames_done / elapsed:.1f} FPS)")
+    if footage:
+        print(f"Footage: {footage:.1f}s ({footage / elapsed:.1f}x real time)")
+    print(f"Wrote {writer.rows} detections to {writer.path}")
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="YOLOv5 Detection and SMS Alert System")
+    parser.add_argument("--batch", nargs="+", metavar="PATH",
+                        help="analyse image folders / video files offline instead of the live camera")
+    parser.add_argument("--output", default=str(LOG_DIR / "detections.jsonl"),
+                        help="batch output file (.jsonl or .csv)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="frames per model call in batch and hub mode")
+    parser.add_argument("--decode-threads", type=int, default=DECODE_THREADS,
+                        help="background decode threads in batch mode, long videos are split between them")
+    parser.add_argument("--all-frames", action="store_true",
+                        help="in batch mode also write a row for frames without detections")
+    parser.add_argument("--hub", nargs="?", const=HUB_PORT, type=int, metavar="PORT",
+                        help=f"receive frames from edge nodes (edge.py) on this port (default {HUB_PORT})")
+    parser.add_argument("--hub-bind", default=HUB_BIND, help="address the hub listens on")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="stop the hub after this many seconds")
+    parser.add_argument("--static-buffers", action="store_true",
+                        help="reuse preallocated frame, tensor and output buffers every iteration")
+    parser.add_argument("--memory-report", type=float, default=0, metavar="SECONDS",
+                        help=f"log tracemalloc/RSS samples to {MEMORY_REPORT_CSV} at this interval")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
     """Main detection loop"""
+    args = parse_args(argv)
+    if args.batch:
+        return run_batch(args.batch, args.output, args.batch_size, args.decode_threads,
+                         args.all_frames)
+    if args.hub is not None:
+        return run_hub(args.hub_bind, args.hub, args.batch_size, args.duration)
+    
     print("Starting YOLOv5 Detection and SMS Alert System")
     
     # Write PID file
@@ -198,6 +1034,7 @@ def main():
     detector = None
     sms_handler = None
     cap = None
+    memory_report = None
     
     try:
         # Initialize detector
@@ -219,16 +1056,45 @@ def main():
             print("Continuing without SMS alerts...")
             sms_handler = None
         
+        frame_path = StaticFramePath(detector) if args.static_buffers else None
+        if args.memory_report > 0:
+            memory_report = MemoryReport(args.memory_report)
+        warmed_up = False
+        
         print("Detection system ready. Press Ctrl+C to stop.")
         
         # Main detection loop
         while True:
-            ret, frame = cap.read()
+            if frame_path:
+                ret = frame_path.read(cap)
+            else:
+                ret, frame = cap.read()
             if not ret:
                 print("Camera read failed, retrying...")
                 time.sleep(1)
                 continue
             
+            if memory_report:
+                memory_report.tick()
+            
+            if frame_path:
+                # Static path: read the preallocated rows, only build strings for an alert
+                n = frame_path.detect()
+                if not warmed_up:
+                    # Buffers and model state now exist, keep them out of GC scans
+                    gc.collect()
+                    gc.freeze()
+                    warmed_up = True
+                if n and sms_handler:
+                    now = time.time()
+                    if now - detector.last_sent.get("any", 0) >= EVENT_COOLDOWN_SECONDS:
+                        message = format_alert_message(frame_path.label_counts(n))
+                        print(f"Sending alert: {message}")
+                        sms_handler.send_sms(DESTINATION_NUMBERS, message)
+                        detector.last_sent["any"] = now
+                time.sleep(0.1)
+                continue
+            
             # Detect objects
             detections = detector.detect(frame)
             
@@ -261,6 +1127,8 @@ def main():
         print(f"Error: {e}")
     finally:
         # Cleanup
+        if memory_report:
+            memory_report.close()
         if cap:
             cap.release()
         if sms_handler:
@@ -272,4 +1140,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
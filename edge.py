@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Edge node for the YOLOv5 Detection and SMS Alert System
+Captures and JPEG-encodes frames (optionally motion-gated) and streams them to a hub
+running `detector.py --hub`. Only needs OpenCV and NumPy, so it runs on a Pi Zero.
+"""
+
+import os
+import re
+import sys
+import time
+import socket
+import struct
+import argparse
+import threading
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# Hub connection
+HUB_HOST = "127.0.0.1"
+HUB_PORT = 5600
+RECONNECT_SECONDS = 5
+
+# Capture and encoding settings
+CAPTURE_INDEX = 0
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 384
+EDGE_FPS = 5
+JPEG_QUALITY = 70
+
+# Motion gating: a frame is sent if enough pixels changed since the last sent frame
+MOTION_PIXEL_THRESHOLD = 25  # Grey level difference per pixel
+MOTION_MIN_FRACTION = 0.01  # Fraction of changed pixels
+MOTION_KEEPALIVE_SECONDS = 30  # Send a frame at least this often even without motion
+
+# Statistics reporting interval
+STATS_INTERVAL_SECONDS = 10
+
+# Wire format: frame header followed by the JPEG payload, ack sent back per frame
+FRAME_HEADER = struct.Struct("!16sIdI")  # node id, sequence, capture time, payload size
+ACK_HEADER = struct.Struct("!IdH")  # sequence, capture time, detection count
+NODE_ID_INVALID = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly size bytes, returns None if the peer closed the connection"""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    pos = 0
+    while pos < size:
+        n = sock.recv_into(view[pos:])
+        if n == 0:
+            return None
+        pos += n
+    return bytes(buf)
+
+
+def encode_node_id(node_id: str) -> bytes:
+    """Pack a node id into the fixed-size header field"""
+    return node_id.encode()[:16].ljust(16, b"\0")
+
+
+def decode_node_id(raw: bytes) -> str:
+    """Unpack a node id from the fixed-size header field
+    
+    Only [A-Za-z0-9_.-] is kept: the id ends up in SMS text written to the
+    modem, where control characters such as Ctrl+Z or CR would end the
+    message and let the rest run as AT commands. May return an empty string.
+    """
+    return NODE_ID_INVALID.sub("", raw.rstrip(b"\0").decode("ascii", errors="ignore"))
+
+
+class MotionGate:
+    """Decide whether a frame differs enough from the last sent one"""
+
+    def __init__(self, min_fraction: float = MOTION_MIN_FRACTION,
+                 keepalive: float = MOTION_KEEPALIVE_SECONDS):
+        self.min_fraction = min_fraction
+        self.keepalive = keepalive
+        self.reference = None
+        self.last_sent = 0.0
+
+    def should_send(self, frame: np.ndarray) -> bool:
+        """Return True if the frame shows motion or the keepalive has expired"""
+        small = cv2.resize(frame, (160, 96), interpolation=cv2.INTER_AREA)
+        grey = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        now = time.time()
+
+        if self.reference is None or now - self.last_sent >= self.keepalive:
+            send = True
+        else:
+            diff = cv2.absdiff(grey, self.reference)
+            changed = np.count_nonzero(diff > MOTION_PIXEL_THRESHOLD) / diff.size
+            send = changed >= self.min_fraction
+
+        if send:
+            self.reference = grey
+            self.last_sent = now
+        return send
+
+
+class EdgeNode:
+    """Capture frames and stream them to the hub"""
+
+    def __init__(self, node_id: str, host: str = HUB_HOST, port: int = HUB_PORT,
+                 source: str = str(CAPTURE_INDEX), fps: float = EDGE_FPS,
+                 quality: int = JPEG_QUALITY, motion: bool = False):
+        self.node_id = node_id
+        self.host = host
+        self.port = port
+        self.source = source
+        self.fps = fps
+        self.quality = quality
+        self.gate = MotionGate() if motion else None
+        self.sock = None
+        self.seq = 0
+
+        # Statistics for the current reporting window
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.skipped = 0
+        self.bytes_sent = 0
+        self.acks = 0
+        self.rtt_sum = 0.0
+        self.rtt_max = 0.0
+        self.window_start = time.time()
+        self.total_sent = 0
+        self.total_acks = 0
+
+    def open_source(self):
+        """Open a camera index or a video file"""
+        if self.source.isdigit():
+            cap = cv2.VideoCapture(int(self.source), cv2.CAP_V4L2)
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+            cap.set(cv2.CAP_PROP_FPS, max(1, int(self.fps)))
+        else:
+            cap = cv2.VideoCapture(self.source)
+        return cap
+
+    def connect(self):
+        """Connect to the hub and start reading acks"""
+        sock = socket.create_connection((self.host, self.port), timeout=10)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        threading.Thread(target=self._read_acks, args=(sock,), daemon=True).start()
+        print(f"Edge {self.node_id} connected to hub {self.host}:{self.port}")
+
+    def _read_acks(self, sock: socket.socket):
+        """Collect round-trip latency from hub acks"""
+        try:
+            while True:
+                data = recv_exact(sock, ACK_HEADER.size)
+                if data is None:
+                    break
+                _, capture_ts, _ = ACK_HEADER.unpack(data)
+                rtt = time.time() - capture_ts
+                with self.lock:
+                    self.acks += 1
+                    self.total_acks += 1
+                    self.rtt_sum += rtt
+                    self.rtt_max = max(self.rtt_max, rtt)
+        except OSError:
+            pass
+
+    def send_frame(self, frame: np.ndarray, capture_ts: float) -> int:
+        """JPEG-encode and send one frame, returns the number of bytes sent"""
+        ok, jpg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return 0
+        header = FRAME_HEADER.pack(encode_node_id(self.node_id), self.seq, capture_ts, jpg.size)
+        self.sock.sendall(header)
+        self.sock.sendall(jpg)
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        return FRAME_HEADER.size + jpg.size
+
+    def report(self):
+        """Print and reset statistics for the current window"""
+        now = time.time()
+        with self.lock:
+            elapsed = max(now - self.window_start, 1e-6)
+            rtt = f"{self.rtt_sum / self.acks * 1000:.0f} ms avg, {self.rtt_max * 1000:.0f} ms max" \
+                if self.acks else "n/a"
+            print(f"Edge {self.node_id}: {self.sent / elapsed:.1f} FPS sent, "
+                  f"{self.bytes_sent / elapsed / 1024:.1f} KB/s, {self.skipped} skipped (no motion), "
+                  f"round trip {rtt}")
+            self.sent = self.skipped = self.bytes_sent = self.acks = 0
+            self.rtt_sum = self.rtt_max = 0.0
+            self.window_start = now
+
+    def run(self, duration: float = 0) -> int:
+        """Capture and stream until interrupted, the source ends or duration expires"""
+        cap = self.open_source()
+        if not cap.isOpened():
+            print(f"Failed to open source: {self.source}")
+            return 1
+
+        is_file = not self.source.isdigit()
+        file_fps = cap.get(cv2.CAP_PROP_FPS) if is_file else 0
+        file_index = 0
+        t_start = time.time()
+        interval = 1.0 / self.fps if self.fps > 0 else 0
+        t_end = time.time() + duration if duration > 0 else None
+        next_report = time.time() + STATS_INTERVAL_SECONDS
+
+        try:
+            while t_end is None or time.time() < t_end:
+                t0 = time.time()
+                if self.sock is None:
+                    try:
+                        self.connect()
+                    except OSError as e:
+                        print(f"Hub not reachable ({e}), retrying in {RECONNECT_SECONDS}s...")
+                        time.sleep(RECONNECT_SECONDS)
+                        continue
+
+                if file_fps > 0:
+                    # Replay files in real time: skip frames the capture rate cannot keep up with
+                    target = int((time.time() - t_start) * file_fps)
+                    while file_index < target and cap.grab():
+                        file_index += 1
+                    file_index += 1
+
+                ret, frame = cap.read()
+                if not ret:
+                    if is_file:
+                        break
+                    print("Camera read failed, retrying...")
+                    time.sleep(1)
+                    continue
+
+                capture_ts = time.time()
+                if self.gate and not self.gate.should_send(frame):
+                    with self.lock:
+                        self.skipped += 1
+                else:
+                    try:
+                        size = self.send_frame(frame, capture_ts)
+                    except OSError as e:
+                        print(f"Connection to hub lost: {e}")
+                        self.sock.close()
+                        self.sock = None
+                        continue
+                    with self.lock:
+                        self.sent += 1
+                        self.total_sent += 1
+                        self.bytes_sent += size
+
+                if time.time() >= next_report:
+                    self.report()
+                    next_report = time.time() + STATS_INTERVAL_SECONDS
+
+                # Pace to the target frame rate
+                delay = interval - (time.time() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+        finally:
+            self.report()
+            cap.release()
+            if self.sock:
+                try:
+                    self.sock.shutdown(socket.SHUT_WR)
+                    # Give the hub a moment to ack frames still in flight
+                    time.sleep(0.5)
+                    self.sock.close()
+                except OSError:
+                    pass
+            print(f"Edge {self.node_id} finished: {self.total_sent} frames sent, "
+                  f"{self.total_acks} acks received")
+        return 0
+
+
+def parse_args(argv: Optional[list] = None) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Edge node: stream JPEG frames to a detection hub")
+    parser.add_argument("--host", default=os.getenv("HUB_HOST", HUB_HOST), help="hub address")
+    parser.add_argument("--port", type=int, default=int(os.getenv("HUB_PORT", HUB_PORT)), help="hub port")
+    parser.add_argument("--node-id", default=socket.gethostname()[:16], help="name shown in hub reports and alerts")
+    parser.add_argument("--source", default=str(CAPTURE_INDEX), help="camera index or video file")
+    parser.add_argument("--fps", type=float, default=EDGE_FPS, help="frames per second to capture")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY, help="JPEG quality (0-100)")
+    parser.add_argument("--motion", action="store_true", help="only send frames with motion")
+    parser.add_argument("--duration", type=float, default=0, help="stop after this many seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Run an edge node"""
+    args = parse_args(argv)
+    node = EdgeNode(args.node_id, args.host, args.port, args.source,
+                    args.fps, args.quality, args.motion)
+    return node.run(args.duration)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import sys
+import os
+import csv
+import json
+import tempfile
+import subprocess
+from collections import Counter
+
+import cv2
+import numpy as np
+
+# Run from the repository root so detector.py finds models/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration
+CLIP_FRAMES = 900  # Long enough to be split into several seek ranges
+CLIP_FPS = 30
+NUM_IMAGES = 3
+DECODE_THREADS = 4
+
+
+def make_inputs(tmp: str) -> tuple[str, str, int]:
+    """Write a synthetic clip and an image folder, returns (clip, folder, decoded clip frames)"""
+    clip = os.path.join(tmp, "clip.mp4")
+    writer = cv2.VideoWriter(clip, cv2.VideoWriter_fourcc(*"mp4v"), CLIP_FPS, (320, 192))
+    if not writer.isOpened():
+        raise RuntimeError(f"Failed to create synthetic clip at {clip}")
+    for i in range(CLIP_FRAMES):
+        frame = np.full((192, 320, 3), 90, dtype=np.uint8)
+        x = (i * 4) % 280
+        cv2.rectangle(frame, (x, 60), (x + 40, 150), (40, 160, 220), -1)
+        cv2.putText(frame, str(i), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        writer.write(frame)
+    writer.release()
+
+    folder = os.path.join(tmp, "images")
+    os.makedirs(folder)
+    for i in range(NUM_IMAGES):
+        image = np.full((240, 320, 3), 60 + i * 40, dtype=np.uint8)
+        cv2.imwrite(os.path.join(folder, f"snap{i}.jpg"), image)
+
+    # Count frames by decoding sequentially, the container count is only an estimate
+    cap = cv2.VideoCapture(clip)
+    frames = 0
+    while cap.grab():
+        frames += 1
+    cap.release()
+    return clip, folder, frames
+
+
+def read_rows(path: str) -> list[dict]:
+    """Parse a JSONL or CSV batch output, empty CSV fields become None"""
+    with open(path, newline="") as fh:
+        if path.endswith(".csv"):
+            return [{k: (v if v != "" else None) for k, v in row.items()} for row in csv.DictReader(fh)]
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def check(rows: list[dict], clip: str, clip_frames: int) -> list[str]:
+    """Return a list of problems found in one output file"""
+    problems = []
+    video = [r for r in rows if r["source"] == clip]
+    images = [r for r in rows if r["source"] != clip]
+
+    frames = {int(r["frame"]) for r in video}
+    missing = set(range(clip_frames)) - frames
+    extra = frames - set(range(clip_frames))
+    if missing:
+        problems.append(f"{len(missing)} clip frames missing, first {sorted(missing)[:5]}")
+    if extra:
+        problems.append(f"unexpected clip frames {sorted(extra)[:5]}")
+
+    empty = Counter(int(r["frame"]) for r in video if r["class_id"] is None)
+    duplicated = [f for f, n in empty.items() if n > 1]
+    if duplicated:
+        problems.append(f"{len(duplicated)} clip frames written more than once, first {sorted(duplicated)[:5]}")
+
+    if len({r["source"] for r in images}) != NUM_IMAGES:
+        problems.append(f"expected rows for {NUM_IMAGES} images")
+    if any(r["position_s"] is not None for r in images):
+        problems.append("position_s is set for an image")
+    return problems
+
+
+def main() -> int:
+    print("Testing batch mode")
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        clip, folder, clip_frames = make_inputs(tmp)
+        print(f"Synthetic clip: {clip_frames} frames, {NUM_IMAGES} images")
+
+        for ext in ("jsonl", "csv"):
+            output = os.path.join(tmp, f"out.{ext}")
+            result = subprocess.run(
+                [sys.executable, "detector.py", "--batch", clip, folder, "--output", output,
+                 "--decode-threads", str(DECODE_THREADS), "--all-frames"],
+                cwd=ROOT,
+            )
+            if result.returncode != 0:
+                print(f"✗ {ext}: detector.py exited with {result.returncode}")
+                failed = True
+                continue
+            try:
+                problems = check(read_rows(output), clip, clip_frames)
+            except (ValueError, KeyError) as e:
+                problems = [f"output does not parse: {e}"]
+            for problem in problems:
+                print(f"✗ {ext}: {problem}")
+            if not problems:
+                print(f"✓ {ext}: every frame written once, images have no position_s")
+            failed = failed or bool(problems)
+
+    if failed:
+        print("✗ Batch test failed")
+        return 1
+    print("✓ Batch test completed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
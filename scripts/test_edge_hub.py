@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import sys
+import os
+import re
+import time
+import tempfile
+import threading
+import subprocess
+
+import cv2
+import numpy as np
+
+# Run from the repository root so detector.py finds models/ and logs/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration
+HUB_PORT = 5601
+DURATION_SECONDS = 30
+CLIP_SECONDS = 20
+CLIP_FPS = 15
+
+
+def make_synthetic_clip(path: str) -> str:
+    """Write a short clip with a moving block so no camera is needed"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), CLIP_FPS, (640, 384))
+    if not writer.isOpened():
+        raise RuntimeError(f"Failed to create synthetic clip at {path}")
+    for i in range(CLIP_SECONDS * CLIP_FPS):
+        frame = np.full((384, 640, 3), 90, dtype=np.uint8)
+        x = (i * 8) % 560
+        cv2.rectangle(frame, (x, 120), (x + 80, 300), (40, 160, 220), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def start(args: list[str], lines: list[str]) -> subprocess.Popen:
+    """Start a process and collect (and echo) its output lines"""
+    proc = subprocess.Popen([sys.executable, "-u", *args], cwd=ROOT, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True)
+
+    def pump():
+        for line in proc.stdout:
+            print(line, end="")
+            lines.append(line)
+
+    threading.Thread(target=pump, daemon=True).start()
+    return proc
+
+
+def main(argv: list[str]) -> int:
+    """Run a hub and one edge node per source on localhost and check they exchanged frames
+
+    Usage: test_edge_hub.py [SOURCE ...]  (camera index or video file, default: synthetic clip)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = argv or [make_synthetic_clip(os.path.join(tmp, "synthetic.mp4"))]
+        print(f"Testing edge/hub mode on localhost:{HUB_PORT} for {DURATION_SECONDS}s")
+
+        hub_lines: list[str] = []
+        hub = start(["detector.py", "--hub", str(HUB_PORT), "--hub-bind", "127.0.0.1",
+                     "--duration", str(DURATION_SECONDS + 5)], hub_lines)
+        time.sleep(5)  # Give the hub time to load the model
+        if hub.poll() is not None:
+            print("✗ Hub exited during startup")
+            return 1
+
+        edges = []
+        for i, source in enumerate(sources):
+            lines: list[str] = []
+            proc = start(["edge.py", "--port", str(HUB_PORT), "--node-id", f"test{i}",
+                          "--source", source, "--duration", str(DURATION_SECONDS)], lines)
+            edges.append((f"test{i}", proc, lines))
+
+        try:
+            for _, proc, _ in edges:
+                proc.wait()
+            hub.wait(timeout=30)
+        except KeyboardInterrupt:
+            print("\nStopping test...")
+            return 1
+        finally:
+            for proc in [p for _, p, _ in edges] + [hub]:
+                if proc.poll() is None:
+                    proc.terminate()
+
+    failed = False
+    for node_id, proc, lines in edges:
+        sent = acks = processed = 0
+        for line in lines:
+            m = re.search(rf"Edge {node_id} finished: (\d+) frames sent, (\d+) acks received", line)
+            if m:
+                sent, acks = int(m.group(1)), int(m.group(2))
+        for line in hub_lines:
+            m = re.search(rf"Edge node disconnected: {node_id} \(.*\), (\d+) frames processed", line)
+            if m:
+                processed += int(m.group(1))
+
+        ok = proc.returncode == 0 and sent > 0 and acks > 0 and processed > 0
+        mark = "✓" if ok else "✗"
+        print(f"{mark} {node_id}: {sent} sent, {processed} processed by hub, {acks} acks received")
+        failed = failed or not ok
+
+    if failed or hub.returncode:
+        print("✗ Edge/hub test failed")
+        return 1
+    print("✓ Edge/hub test completed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
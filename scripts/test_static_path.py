@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import sys
+import os
+
+import cv2
+import numpy as np
+
+# Add parent directory to path to import detector
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Run from the repository root so the detector finds models/
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ultralytics.utils import ASSETS
+
+from detector import YOLOv5Detector, StaticFramePath
+
+# Frame sizes to compare: native capture size, 4:3 camera, and one that needs resizing
+FRAME_SIZES = [(640, 384), (640, 480), (1280, 720)]
+CONFIDENCE_TOLERANCE = 0.03
+MIN_BOX_IOU = 0.85
+
+
+def iou(a: list[int], b: list[int]) -> float:
+    """IoU of two [x, y, w, h] boxes"""
+    ax2, ay2, bx2, by2 = a[0] + a[2], a[1] + a[3], b[0] + b[2], b[1] + b[3]
+    iw = max(0, min(ax2, bx2) - max(a[0], b[0]))
+    ih = max(0, min(ay2, by2) - max(a[1], b[1]))
+    inter = iw * ih
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def static_detections(frame_path: StaticFramePath, frame: np.ndarray) -> list[dict]:
+    """Run the static path on a frame and return rows in the detect() format"""
+    frame_path.frame = frame
+    n = frame_path.detect()
+    return [{"class_id": int(cls), "confidence": float(conf),
+             "box": [int(x1), int(y1), int(x2 - x1), int(y2 - y1)]}
+            for x1, y1, x2, y2, conf, cls in frame_path.detections[:n]]
+
+
+def compare(reference: list[dict], static: list[dict]) -> list[str]:
+    """Return a list of mismatches between detect() and the static path"""
+    problems = []
+    if len(reference) != len(static):
+        problems.append(f"detect() found {len(reference)} objects, static path {len(static)}")
+    unmatched = list(static)
+    for ref in sorted(reference, key=lambda d: -d["confidence"]):
+        candidates = [d for d in unmatched if d["class_id"] == ref["class_id"]]
+        best = max(candidates, key=lambda d: iou(ref["box"], d["box"]), default=None)
+        if best is None or iou(ref["box"], best["box"]) < MIN_BOX_IOU:
+            problems.append(f"no static match for {ref['label']} {ref['confidence']:.2f} {ref['box']}")
+            continue
+        unmatched.remove(best)
+        if abs(best["confidence"] - ref["confidence"]) > CONFIDENCE_TOLERANCE:
+            problems.append(f"{ref['label']} confidence {ref['confidence']:.3f} vs {best['confidence']:.3f}")
+    return problems
+
+
+def main(argv: list[str]) -> int:
+    """Compare YOLOv5Detector.detect() with StaticFramePath on the same frames
+
+    Usage: test_static_path.py [IMAGE ...]  (default: ultralytics sample images)
+    """
+    paths = argv or [str(ASSETS / "bus.jpg"), str(ASSETS / "zidane.jpg")]
+    print("Comparing detect() with the static buffer path")
+
+    detector = YOLOv5Detector()
+    frame_path = StaticFramePath(detector)
+
+    failed = False
+    compared = 0
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"✗ Failed to read {path}")
+            failed = True
+            continue
+        for width, height in FRAME_SIZES:
+            frame = cv2.resize(image, (width, height))
+            reference = detector.detect(frame)
+            static = static_detections(frame_path, frame.copy())
+            problems = compare(reference, static)
+            name = f"{os.path.basename(path)} {width}x{height}"
+            if problems:
+                failed = True
+                for problem in problems:
+                    print(f"✗ {name}: {problem}")
+            else:
+                print(f"✓ {name}: {len(reference)} detections match")
+            compared += len(reference)
+
+    if compared == 0:
+        print("✗ No detections to compare, use images that contain people, cats or dogs")
+        failed = True
+    if failed:
+        print("✗ Static path test failed")
+        return 1
+    print("✓ Static path test completed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))